@@ -1,5 +1,19 @@
 # pyseqr/__init__.py
 
-from .core import find_in_list
+from .core import (
+    find_in_list,
+    iter_find_in_list,
+    SequenceIndex,
+    clear_target_cache,
+    ElementGap,
+    OccurrenceGap,
+)
 
-__all__ = ["find_in_list"]
+__all__ = [
+    "find_in_list",
+    "iter_find_in_list",
+    "SequenceIndex",
+    "clear_target_cache",
+    "ElementGap",
+    "OccurrenceGap",
+]
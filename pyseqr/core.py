@@ -1,8 +1,12 @@
-from typing import List, Sequence, Any, Optional
-from decimal import Decimal, getcontext, InvalidOperation, ROUND_HALF_UP
-import bisect
-from abc import ABC, abstractmethod
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterator, List, Sequence, Any
+from decimal import Context, Decimal, InvalidOperation, MAX_PREC, ROUND_HALF_UP
+from bisect import bisect_right
+import threading
+from array import array
 from enum import Enum
+from collections import Counter, OrderedDict
 
 
 class OccurrenceGap(Enum):
@@ -15,91 +19,33 @@ class ElementGap(Enum):
     NON_NEGATIVE = "non-negative"
 
 
-class OccurrenceGapStrategy(ABC):
-    """Abstract base class for occurrence gap strategies."""
-
-    @abstractmethod
-    def filter_indices(self, indices: List[int], last_occurrence_max: int) -> List[int]:
-        """
-        Given a list of candidate indices for an element and
-        the maximum index used in the previous occurrence,
-        return the filtered list of valid indices.
-
-        Args:
-            indices (List[int]): The list of candidate indices.
-            last_occurrence_max (int): The maximum index used in the previous occurrence.
-
-        Returns:
-            List[int]: The filtered list of valid indices.
-        """
-        pass
-
-
-class AnyOccurrenceGapStrategy(OccurrenceGapStrategy):
-    def filter_indices(self, indices, last_occurrence_max):
-        """Return the indices unmodified (any overlap is allowed)"""
-        return indices
-
-
-class NonNegativeOccurrenceGapStrategy(OccurrenceGapStrategy):
-    def filter_indices(self, indices, last_occurrence_max):
-        """If "non-negative", remove all indices <= last_occurrence_max."""
-        # If "non-negative", remove all indices <= last_occurrence_max
-        # (i.e., no overlap with previous occurrence)
-        pos = bisect.bisect_right(indices, last_occurrence_max)
-        return indices[pos:]
+# Sublists with at most this many distinct elements are indexed with one
+# C-level search per element instead of a Python-level scan of target, when
+# the elements of both sublist and target are exactly of these types.
+# target.index compares by the target elements' __eq__; for these types that
+# never raises and agrees with dict lookup, so the matches are the same
+# either way. Any other target element (e.g. one with a permissive or raising
+# __eq__) sends the search through the hash-based scan. Checking the target's
+# types costs about one scan, so only a single element is worth scanning for.
+SCAN_MAX_ELEMENTS = 1
+SCAN_TYPES = frozenset({int, float, str, bytes})
 
+# Context used for rounding floats. Its precision only needs to hold every
+# digit of the rounded value, so it is set to the maximum rather than being
+# adjusted (globally) for each float.
+ROUNDING_CONTEXT = Context(prec=MAX_PREC)
 
-class ElementGapStrategy(ABC):
-    """Abstract base class for element gap strategies."""
-
-    @abstractmethod
-    def pick_index(
-        self, indices: List[int], current_occurrence: List[int]
-    ) -> Optional[int]:
-        """
-        Given a list of candidate indices and the current_occurrence so far,
-        pick and remove (pop) one valid index to match the sublist element.
+# Number of target indexes kept by find_in_list(..., cache_target=True)
+TARGET_CACHE_SIZE = 8
 
-        Returns the picked index or None if no valid index exists.
+# (id(target), ensure_hashable, use_custom_str, float_precision) ->
+# SequenceIndex. The index holds the target, which keeps its id from being
+# reused while the entry is cached.
+_TARGET_CACHE = OrderedDict()
 
-        Args:
-            indices (List[int]): The list of candidate indices.
-            current_occurrence (List[int]): The current occurrence so far.
-
-        Returns:
-            Optional[int]: The picked index or None if no valid index exists.
-        """
-        pass
-
-
-class AnyOrderElementGapStrategy(ElementGapStrategy):
-    def pick_index(self, indices, current_occurrence):
-        """Order is unimportant, we pick the first index element is found."""
-        return indices.pop(0) if indices else None
-
-
-class OrderedElementGapStrategy(ElementGapStrategy):
-    def pick_index(self, indices, current_occurrence):
-        """Enforces strictly ordered elements for each occurrence."""
-        last_index = current_occurrence[-1] if current_occurrence else -1
-        # We need the first index in `indices` that is > last_index
-        pos = bisect.bisect_right(indices, last_index)
-        if pos < len(indices):
-            return indices.pop(pos)
-        else:
-            return None
-
-
-OCCURRENCE_GAP_STRATEGIES = {
-    OccurrenceGap.ANY: AnyOccurrenceGapStrategy(),
-    OccurrenceGap.NON_NEGATIVE: NonNegativeOccurrenceGapStrategy(),
-}
-
-ELEMENT_GAP_STRATEGIES = {
-    ElementGap.ANY: AnyOrderElementGapStrategy(),
-    ElementGap.NON_NEGATIVE: OrderedElementGapStrategy(),
-}
+# Guards _TARGET_CACHE, which is shared by cache_target=True calls from all
+# threads; its get/move_to_end/popitem sequences are not atomic on their own
+_TARGET_CACHE_LOCK = threading.Lock()
 
 
 def validate_inputs(sublist: Sequence[Any], target: Sequence[Any]) -> None:
@@ -121,6 +67,35 @@ def validate_inputs(sublist: Sequence[Any], target: Sequence[Any]) -> None:
         raise ValueError("Sublist cannot be longer than target.")
 
 
+def make_rounder(decimal_places=2) -> Callable[[float], Decimal]:
+    """Build a function that rounds numbers to a fixed number of decimal places.
+
+    Args:
+        decimal_places (int, optional): The number of decimal places to round to. Defaults to 2.
+
+    Returns:
+        Callable[[float], Decimal]: A function returning a number rounded
+            half-up as a Decimal object.
+
+    Raises:
+        ValueError: If decimal_places is negative.
+
+    Examples:
+        >>> make_rounder(2)(1.005)
+        Decimal('1.01')
+    """
+    if decimal_places < 0:
+        raise ValueError("decimal_places cannot be negative.")
+    quantum = Decimal("1.{places}".format(places="0" * decimal_places))
+
+    def round_number(num) -> Decimal:
+        return Decimal(str(num)).quantize(
+            quantum, rounding=ROUND_HALF_UP, context=ROUNDING_CONTEXT
+        )
+
+    return round_number
+
+
 def round_as_decimal(num, decimal_places=2):
     """Round a number to a specified number of decimal places.
 
@@ -132,21 +107,154 @@ def round_as_decimal(num, decimal_places=2):
         Decimal: The rounded number as a Decimal object.
 
     Raises:
+        ValueError: If decimal_places is negative.
         InvalidOperation: If the rounding operation is invalid.
 
     https://stackoverflow.com/questions/8868985/problems-with-rounding-decimals-python solution by kamalgill
     """
-    getcontext().prec = decimal_places + 1
-    precision = "1.{places}".format(places="0" * decimal_places)
-    return Decimal(str(num)).quantize(Decimal(precision), rounding=ROUND_HALF_UP)
+    return make_rounder(decimal_places)(num)
+
+
+def make_converter(
+    ensure_hashable, use_custom_str, float_precision=None
+) -> Callable[[Sequence[Any]], Sequence[Any]]:
+    """Build a function that converts the elements of a sequence to hashable types.
+
+    How an element is converted depends only on its type, so the conversion
+    is resolved once per type and looked up in a dispatch table afterwards.
+    Elements of types that need no conversion are left untouched, and a
+    sequence made up only of such elements is returned as is.
+
+    Args:
+        ensure_hashable (bool): Whether to ensure elements are hashable.
+        use_custom_str (bool): Whether to use a custom string representation for elements.
+        float_precision (int, optional): The number of decimal places to round floats to. Defaults to None.
+
+    Returns:
+        Callable[[Sequence[Any]], Sequence[Any]]: A function returning the hashable
+            versions of the elements of a sequence.
+
+    Examples:
+        >>> convert = make_converter(ensure_hashable=True, use_custom_str=False)
+        >>> convert([1, [2, 3]])
+        [1, (2, 3)]
+    """
+    handlers = {}
+
+    def convert(element: Any) -> Any:
+        handler = handlers.get(type(element))
+        if handler is None:
+            handler = handlers[type(element)] = resolve(type(element))
+        return handler(element)
+
+    if float_precision:
+        try:
+            round_number = make_rounder(float_precision)
+        except ValueError:
+            raise ValueError("Invalid float precision.")
+
+    # Floats repeat often in real data, so each value is rounded only once
+    rounded = {}
+
+    def round_float(element: float) -> Decimal:
+        result = rounded.get(element)
+        if result is None:
+            try:
+                result = rounded[element] = round_number(element)
+            except InvalidOperation:
+                raise ValueError("Invalid float precision.")
+        return result
+
+    def list_to_tuple(element: list) -> tuple:
+        return tuple(map(convert, element))
+
+    def dict_to_frozenset(element: dict) -> frozenset:
+        return frozenset((k, convert(v)) for k, v in element.items())
+
+    def set_to_frozenset(element: set) -> frozenset:
+        return frozenset(map(convert, element))
+
+    def resolve(element_type: type) -> Callable[[Any], Any]:
+        """Pick the conversion for a type, checked in order of precedence."""
+        if float_precision and issubclass(element_type, float):
+            return round_float
+
+        if ensure_hashable:
+            if issubclass(element_type, list):
+                return list_to_tuple
+            elif issubclass(element_type, dict):
+                return dict_to_frozenset
+            elif issubclass(element_type, set):
+                return set_to_frozenset
+
+        # Custom objects (i.e., not built-in types) match on their string
+        # representation; every object has a __str__, so no check is needed
+        if use_custom_str and element_type.__module__ != "builtins":
+            return str
+
+        return _identity
+
+    # id(element) -> (element, converted) for containers. The same container
+    # object repeated in a sequence is converted once; holding it keeps its
+    # id from being reused while the converter is alive. Nested elements go
+    # through convert directly, as they are rarely shared.
+    converted = {}
+    element_handlers = {}
+
+    def resolve_element(element_type: type) -> Callable[[Any], Any]:
+        """Like resolve, but memoizing the conversion of containers."""
+        handler = resolve(element_type)
+        if handler not in (list_to_tuple, dict_to_frozenset, set_to_frozenset):
+            return handler
+
+        def convert_container(element: Any) -> Any:
+            entry = converted.get(id(element))
+            if entry is None:
+                entry = converted[id(element)] = (element, handler(element))
+            return entry[1]
+
+        return convert_container
+
+    def element_handler(element_type: type) -> Callable[[Any], Any]:
+        handler = element_handlers.get(element_type)
+        if handler is None:
+            handler = element_handlers[element_type] = resolve_element(element_type)
+        return handler
+
+    def convert_element(element: Any) -> Any:
+        return element_handler(type(element))(element)
+
+    def convert_all(elements: Sequence[Any]) -> Sequence[Any]:
+        element_types = set(map(type, elements))
+        to_convert = {
+            element_type
+            for element_type in element_types
+            if element_handler(element_type) is not _identity
+        }
+        if not to_convert:
+            return elements
+        if len(element_types) == 1:
+            # All elements share one conversion (e.g. instances of one custom
+            # class), so map it over the sequence directly
+            return list(map(element_handler(element_types.pop()), elements))
+        return [convert_element(e) if type(e) in to_convert else e for e in elements]
+
+    return convert_all
+
+
+def _identity(element: Any) -> Any:
+    """Return the element unchanged."""
+    return element
 
 
 def make_hashable(
     element: Any, ensure_hashable, use_custom_str, float_precision=None
 ) -> Any:
-    # write docstring in google format for this function:
     """Convert an element to a hashable type.
 
+    Converting many elements with the same flags is faster with a single
+    call to a converter from make_converter.
+
     Args:
         element (Any): The element to convert.
         ensure_hashable (bool): Whether to ensure the element is hashable.
@@ -156,40 +264,8 @@ def make_hashable(
     Returns:
         Any: The hashable version of the element.
     """
-
-    def _process(sub_element: Any) -> Any:
-        """Helper to avoid repeating the same arguments for recursive calls."""
-        return make_hashable(
-            sub_element, ensure_hashable, use_custom_str, float_precision
-        )
-
-    if float_precision and isinstance(element, float):
-        try:
-            getcontext().prec = float_precision
-            return round_as_decimal(element, float_precision)
-        except (InvalidOperation, ValueError):
-            raise ValueError("Invalid float precision.")
-
-    if ensure_hashable:
-        if isinstance(element, list):
-            return tuple(_process(e) for e in element)
-        elif isinstance(element, dict):
-            return frozenset((k, make_hashable(v)) for k, v in element.items())
-        elif isinstance(element, set):
-            return frozenset(_process(e) for e in element)
-
-    if use_custom_str:
-        # Check if the element is a custom object (i.e., not a built-in type)
-        if type(element).__module__ != "builtins":
-            # Ensure the custom object has a string representation
-            if hasattr(element, "__str__") and callable(getattr(element, "__str__")):
-                return str(element)
-            else:
-                raise TypeError(
-                    f"Custom object of type {type(element).__name__} lacks a string representation."
-                )
-
-    return element
+    convert = make_converter(ensure_hashable, use_custom_str, float_precision)
+    return convert([element])[0]
 
 
 def remove_overlaps(indices, max_index):
@@ -210,10 +286,623 @@ def remove_overlaps(indices, max_index):
         []
     """
     # Find the first index where the value is greater than max_index
-    pos = bisect.bisect_right(indices, max_index)
+    pos = bisect_right(indices, max_index)
     return indices[pos:]
 
 
+def build_index_map(
+    sublist: Sequence[Any], target: Sequence[Any]
+) -> Dict[Any, List[int]]:
+    """Map each distinct sublist element to the sorted indices where it occurs in target.
+
+    Args:
+        sublist (Sequence[Any]): The sublist whose elements are looked up.
+        target (Sequence[Any]): The list to scan.
+
+    Returns:
+        Dict[Any, List[int]]: Indices in `target` for every element of `sublist`.
+            Once an element turns out to be missing from `target`, the lists
+            of elements not scanned yet may be left empty.
+
+    Raises:
+        ValueError: If an element of sublist is not hashable.
+
+    Examples:
+        >>> build_index_map([2, 3], [1, 2, 3, 2])
+        {2: [1, 3], 3: [2]}
+    """
+    index_map = {element: [] for element in _distinct_elements(sublist)}
+
+    scalars = _all_scan_types(index_map)
+    if scalars and len(index_map) <= SCAN_MAX_ELEMENTS and _all_scan_types(target):
+        # Few plain scalars: let the C-level sequence search do the scanning
+        for element, indices in index_map.items():
+            _scan_indices(target, element, indices)
+            if not indices:
+                break  # no occurrence is possible, skip the other scans
+        return index_map
+
+    # Populate the index_map with indices of matching elements in the target
+    if scalars:
+        # Hits are looked up again, but scalar hashes are cheap or cached.
+        # Membership is tested on the dict itself: a set (frozenset) would
+        # quietly accept unhashable set elements of target instead of raising
+        for index, value in enumerate(target):
+            if value in index_map:
+                index_map[value].append(index)
+    else:
+        # Hashes of tuples, Decimals etc. are not cached, so look each
+        # target element up only once
+        get_indices = index_map.get
+        for index, value in enumerate(target):
+            indices = get_indices(value)
+            if indices is not None:
+                indices.append(index)
+    return index_map
+
+
+def _distinct_elements(sublist: Sequence[Any]) -> set:
+    """Return the distinct elements of sublist.
+
+    Raises:
+        ValueError: If an element of sublist is not hashable.
+    """
+    try:
+        return set(sublist)
+    except TypeError as e:
+        raise ValueError("All elements in sublist must be hashable.") from e
+
+
+def build_target_index(target: Sequence[Any]) -> Dict[Any, List[int]]:
+    """Map every distinct element of target to the sorted indices where it occurs.
+
+    Args:
+        target (Sequence[Any]): The list to index.
+
+    Returns:
+        Dict[Any, List[int]]: Indices in `target` for every element of `target`.
+
+    Examples:
+        >>> build_target_index([1, 2, 1])
+        {1: [0, 2], 2: [1]}
+    """
+    target_index = {}
+    for index, value in enumerate(target):
+        indices = target_index.get(value)
+        if indices is None:
+            target_index[value] = [index]
+        else:
+            indices.append(index)
+    return target_index
+
+
+def clear_target_cache() -> None:
+    """Drop all target indexes cached by find_in_list(..., cache_target=True)."""
+    with _TARGET_CACHE_LOCK:
+        _TARGET_CACHE.clear()
+
+
+def _cached_sequence_index(
+    target, ensure_hashable, use_custom_str, float_precision
+) -> "SequenceIndex":
+    """Return the cached SequenceIndex of target, building it on a miss.
+
+    Args:
+        target (Sequence[Any]): The target as passed by the caller.
+        ensure_hashable (bool): Whether to ensure elements are hashable.
+        use_custom_str (bool): Whether to use a custom string representation for elements.
+        float_precision (int, optional): The number of decimal places to round floats to.
+
+    Returns:
+        SequenceIndex: An index of `target` built with the given flags.
+    """
+    key = (id(target), ensure_hashable, use_custom_str, float_precision)
+    with _TARGET_CACHE_LOCK:
+        index = _TARGET_CACHE.get(key)
+        if index is not None and index.target is target and len(index) == len(target):
+            _TARGET_CACHE.move_to_end(key)
+            return index
+
+    # Index outside the lock, so building one target's index does not hold up
+    # searches of the others. Threads missing on the same target may each
+    # build one; they are equivalent, and the last one stored is kept.
+    index = SequenceIndex(target, ensure_hashable, use_custom_str, float_precision)
+    with _TARGET_CACHE_LOCK:
+        _TARGET_CACHE[key] = index
+        _TARGET_CACHE.move_to_end(key)
+        if len(_TARGET_CACHE) > TARGET_CACHE_SIZE:
+            _TARGET_CACHE.popitem(last=False)
+    return index
+
+
+def _all_scan_types(elements: Sequence[Any]) -> bool:
+    """Return whether every element is exactly of one of SCAN_TYPES.
+
+    Stops at the first element of another type.
+
+    Examples:
+        >>> _all_scan_types([1, 2.0, "a"])
+        True
+
+        >>> _all_scan_types([1, (2,)])
+        False
+    """
+    return SCAN_TYPES.issuperset(map(type, elements))
+
+
+def _scan_indices(target: Sequence[Any], element: Any, indices: List[int]) -> None:
+    """Append every index of element in target to indices using target.index.
+
+    Only call this when every element of target is of SCAN_TYPES: comparing
+    those never raises, so a ValueError from target.index can only mean
+    that there are no more occurrences.
+
+    Args:
+        target (Sequence[Any]): The list to scan.
+        element (Any): The element to look for.
+        indices (List[int]): The list to append matching indices to.
+    """
+    find = target.index
+    pos = -1
+    try:
+        while True:
+            pos = find(element, pos + 1)
+            indices.append(pos)
+    except ValueError:
+        pass  # no further occurrence of element
+
+
+def _first_free(skips, pos):
+    """Return the first position >= pos that has not been consumed.
+
+    `skips` maps each position consumed out of order to a later position
+    to check next. Chains are compressed as they are followed, so repeated
+    lookups over the same run of consumed positions stay cheap.
+
+    Args:
+        skips (Dict[int, int]): Skip pointers for consumed positions.
+        pos (int): The position to start from.
+
+    Returns:
+        int: The first free position.
+
+    Examples:
+        >>> _first_free({}, 2)
+        2
+
+        >>> _first_free({2: 3, 3: 4}, 2)
+        4
+    """
+    free = pos
+    while free in skips:
+        free = skips[free]
+    while pos != free:
+        skips[pos], pos = free, skips[pos]
+    return free
+
+
+def _match_any_any(
+    sub_ids: List[int], postings: List[List[int]], max_occurrences: int
+) -> Iterator[List[int]]:
+    """Any overlap, any order: each element takes its first unused index.
+
+    The k-th repeat of an element in the sublist takes every count-th index
+    of that element, so each sublist position reads a strided slice of its
+    postings and the occurrences are those slices zipped together.
+
+    Args:
+        sub_ids (List[int]): The sublist with each element replaced by its id.
+        postings (List[List[int]]): Sorted target indices for each id.
+        max_occurrences (int): An upper bound on the number of occurrences.
+
+    Returns:
+        Iterator[List[int]]: The index-lists of the matching occurrences, in order.
+
+    Examples:
+        >>> list(_match_any_any([0, 1, 0], [[1, 3], [2]], 1))
+        [[1, 2, 3]]
+    """
+    counts = Counter(sub_ids)
+    seen = Counter()
+    columns = []
+    # Every occurrence uses exactly one index per sublist position, so the
+    # bound is exact and every column holds max_occurrences indices
+    for sid in sub_ids:
+        count = counts[sid]
+        rank = seen[sid]
+        seen[sid] = rank + 1
+        columns.append(postings[sid][rank : rank + count * max_occurrences : count])
+    return map(list, zip(*columns))
+
+
+def _match_non_negative_any(
+    sub_ids: List[int], postings: List[List[int]], max_occurrences: int
+) -> Iterator[List[int]]:
+    """No overlap, any order: each element takes its first index after the
+    previous occurrence.
+
+    Args:
+        sub_ids (List[int]): The sublist with each element replaced by its id.
+        postings (List[List[int]]): Sorted target indices for each id.
+        max_occurrences (int): An upper bound on the number of occurrences.
+
+    Yields:
+        List[int]: The indices of each matching occurrence, in order.
+    """
+    heads = [0] * len(postings)
+    last_occurrence_max = -1
+    for _ in range(max_occurrences):
+        current_occurrence = []
+        current_max = -1
+        for sid in sub_ids:
+            indices = postings[sid]
+            head = heads[sid]
+            if head == len(indices):
+                return  # no more valid matches
+            if indices[head] <= last_occurrence_max:
+                # Skip all indices that would overlap the previous occurrence
+                head = bisect_right(indices, last_occurrence_max, head + 1)
+                if head == len(indices):
+                    return
+            found_index = indices[head]
+            current_occurrence.append(found_index)
+            heads[sid] = head + 1
+            if found_index > current_max:
+                current_max = found_index
+        yield current_occurrence
+        last_occurrence_max = current_max
+    return
+
+
+def _match_any_non_negative(
+    sub_ids: List[int], postings: List[List[int]], max_occurrences: int
+) -> Iterator[List[int]]:
+    """Any overlap, ordered: each element takes its first unused index after
+    the previous element of the occurrence.
+
+    Indices passed over this way stay available to later occurrences, so
+    those taken out of order are tracked with skip pointers.
+
+    Args:
+        sub_ids (List[int]): The sublist with each element replaced by its id.
+        postings (List[List[int]]): Sorted target indices for each id.
+        max_occurrences (int): An upper bound on the number of occurrences.
+
+    Yields:
+        List[int]: The indices of each matching occurrence, in order.
+    """
+    heads = [0] * len(postings)
+    taken = [{} for _ in postings]
+    for _ in range(max_occurrences):
+        current_occurrence = []
+        last_index = -1
+        for sid in sub_ids:
+            indices = postings[sid]
+            skips = taken[sid]
+            head = heads[sid]
+            if head == len(indices):
+                return  # no more valid matches
+            pos = head
+            if indices[head] <= last_index:
+                # We need the first free index in `indices` that is > last_index
+                pos = bisect_right(indices, last_index, head + 1)
+                if pos in skips:
+                    pos = _first_free(skips, pos)
+                if pos >= len(indices):
+                    return
+            if pos == head:
+                heads[sid] = _first_free(skips, pos + 1)
+            else:
+                skips[pos] = pos + 1
+            last_index = indices[pos]
+            current_occurrence.append(last_index)
+        yield current_occurrence
+    return
+
+
+def _match_non_negative_non_negative(
+    sub_ids: List[int], postings: List[List[int]], max_occurrences: int
+) -> Iterator[List[int]]:
+    """No overlap, ordered: each element takes its first index after the
+    previous element, continuing from the end of the previous occurrence.
+
+    Args:
+        sub_ids (List[int]): The sublist with each element replaced by its id.
+        postings (List[List[int]]): Sorted target indices for each id.
+        max_occurrences (int): An upper bound on the number of occurrences.
+
+    Yields:
+        List[int]: The indices of each matching occurrence, in order.
+    """
+    heads = [0] * len(postings)
+    last_index = -1
+    for _ in range(max_occurrences):
+        current_occurrence = []
+        for sid in sub_ids:
+            indices = postings[sid]
+            pos = heads[sid]
+            if pos == len(indices):
+                return  # no more valid matches
+            if indices[pos] <= last_index:
+                pos = bisect_right(indices, last_index, pos + 1)
+                if pos == len(indices):
+                    return
+            last_index = indices[pos]
+            current_occurrence.append(last_index)
+            heads[sid] = pos + 1
+        yield current_occurrence
+    return
+
+
+# One matching loop per combination of gap flags, so the loops carry no
+# per-element branching on the flags
+MATCH_LOOPS = {
+    (OccurrenceGap.ANY, ElementGap.ANY): _match_any_any,
+    (OccurrenceGap.NON_NEGATIVE, ElementGap.ANY): _match_non_negative_any,
+    (OccurrenceGap.ANY, ElementGap.NON_NEGATIVE): _match_any_non_negative,
+    (
+        OccurrenceGap.NON_NEGATIVE,
+        ElementGap.NON_NEGATIVE,
+    ): _match_non_negative_non_negative,
+}
+
+
+def _find_ordered_non_overlapping(
+    sublist: Sequence[Any], target: Sequence[Any]
+) -> Iterator[List[int]]:
+    """Find ordered, non-overlapping occurrences with forward C-level searches.
+
+    Each element is matched at its first index after the previous match, so
+    the searches only move forward and scan target at most once in total.
+    target.index compares by the target elements' __eq__, so this is only
+    used when the elements of both sublist and target are of SCAN_TYPES.
+
+    Args:
+        sublist (Sequence[Any]): The sublist to look for.
+        target (Sequence[Any]): The list to search in.
+
+    Yields:
+        List[int]: The indices of each matching occurrence, in order.
+
+    Examples:
+        >>> list(_find_ordered_non_overlapping([1, 2], [1, 3, 1, 7, 2, 8, 2, 9, 1, 2]))
+        [[0, 4], [8, 9]]
+    """
+    find = target.index
+    pos = -1
+    try:
+        while True:
+            current_occurrence = []
+            for element in sublist:
+                pos = find(element, pos + 1)
+                current_occurrence.append(pos)
+            yield current_occurrence
+    except ValueError:
+        # Comparing SCAN_TYPES elements never raises, so this only means
+        # that the last element searched for has no further occurrence
+        return
+
+
+def _match(
+    sublist: Sequence[Any],
+    index_map: Dict[Any, Sequence[int]],
+    occurrence_gap: OccurrenceGap,
+    element_gap: ElementGap,
+) -> Iterator[List[int]]:
+    """Match the occurrences of sublist given the target indices of its elements.
+
+    Args:
+        sublist (Sequence[Any]): The (converted) sublist to look for.
+        index_map (Dict[Any, Sequence[int]]): Sorted target indices for every
+            distinct element of `sublist`.
+        occurrence_gap (OccurrenceGap): How occurrences may overlap.
+        element_gap (ElementGap): How elements must be ordered.
+
+    Returns:
+        Iterator[List[int]]: The index-lists of the matching occurrences, in order.
+    """
+    if len(sublist) == 1:
+        # A single element matches at each of its indices, whatever the gaps
+        return ([index] for index in index_map[sublist[0]])
+
+    # Intern each distinct sublist element to a small integer id so the
+    # matching loop works on plain lists instead of hashing elements
+    ids = {element: i for i, element in enumerate(index_map)}
+    sub_ids = [ids[element] for element in sublist]
+    postings = list(index_map.values())
+
+    # Each occurrence uses a distinct index for every repeat of an element,
+    # which bounds the number of occurrences
+    max_occurrences = min(
+        len(postings[sid]) // count for sid, count in Counter(sub_ids).items()
+    )
+    if not max_occurrences:
+        return iter(())
+
+    return MATCH_LOOPS[(occurrence_gap, element_gap)](
+        sub_ids, postings, max_occurrences
+    )
+
+
+class SequenceIndex:
+    """An index of a target list for running many searches against it.
+
+    The target is converted and indexed once, so each search only pays for
+    converting its sublist and matching. The target must not be modified in
+    place while it is indexed. Searches never modify the index, so one
+    SequenceIndex can be shared between threads.
+
+    Args:
+        target (Sequence[Any]): The list to search in.
+        ensure_hashable (bool): Convert unhashable elements to hashable.
+        use_custom_str (bool): Use a custom string representation for custom objects.
+        float_precision (int, optional): Round floats to this number of decimal places.
+
+    Raises:
+        TypeError: If target is not a list or tuple.
+        ValueError: If target is empty, or float_precision is invalid.
+
+    Examples:
+        >>> index = SequenceIndex([1, 2, 3, 1, 2, 3])
+        >>> index.find([1, 2])
+        [[0, 1], [3, 4]]
+
+        >>> index.find([3, 1], occurrence_gap="non-negative")
+        [[2, 0], [5, 3]]
+    """
+
+    def __init__(
+        self,
+        target: Sequence[Any],
+        ensure_hashable: bool = False,
+        use_custom_str: bool = False,
+        float_precision: int = None,
+    ):
+        if not isinstance(target, (list, tuple)):
+            raise TypeError("Target must be of type list or tuple.")
+        if not target:
+            raise ValueError("Target cannot be empty.")
+
+        self.target = target
+        self._flags = (ensure_hashable, use_custom_str, float_precision)
+        if ensure_hashable or use_custom_str or float_precision:
+            target = make_converter(*self._flags)(target)
+
+        # Indexes are long-lived, so store them as packed 8-byte integers
+        # rather than lists of int objects (~36 bytes per index)
+        self._index = {
+            value: array("q", indices)
+            for value, indices in build_target_index(target).items()
+        }
+        self._length = len(target)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def iter_find(
+        self,
+        sublist: Sequence[Any],
+        occurrence_gap: OccurrenceGap = OccurrenceGap.ANY,
+        element_gap: ElementGap = ElementGap.ANY,
+    ) -> Iterator[List[int]]:
+        """Lazily find the occurrences of sublist in the indexed target.
+
+        Args:
+            sublist (Sequence[Any]): The sublist to look for.
+            occurrence_gap (OccurrenceGap): Strategy for how occurrences may overlap.
+            element_gap (ElementGap): Strategy for how elements must appear (ordered or any).
+
+        Returns:
+            Iterator[List[int]]: The index-lists of the matching occurrences, in order.
+        """
+        validate_inputs(sublist, self.target)
+        occurrence_gap = OccurrenceGap(occurrence_gap)
+        element_gap = ElementGap(element_gap)
+
+        ensure_hashable, use_custom_str, float_precision = self._flags
+        if ensure_hashable or use_custom_str or float_precision:
+            sublist = make_converter(*self._flags)(sublist)
+        return self._match_converted(
+            sublist, _distinct_elements(sublist), occurrence_gap, element_gap
+        )
+
+    def _match_converted(
+        self,
+        sublist: Sequence[Any],
+        elements: set,
+        occurrence_gap: OccurrenceGap,
+        element_gap: ElementGap,
+    ) -> Iterator[List[int]]:
+        """Match a converted sublist, given its distinct elements."""
+        index_map = {e: self._index.get(e, ()) for e in elements}
+        return _match(sublist, index_map, occurrence_gap, element_gap)
+
+    def find(
+        self,
+        sublist: Sequence[Any],
+        occurrence_gap: OccurrenceGap = OccurrenceGap.ANY,
+        element_gap: ElementGap = ElementGap.ANY,
+    ) -> List[List[int]]:
+        """Find all occurrences of sublist in the indexed target.
+
+        Args:
+            sublist (Sequence[Any]): The sublist to look for.
+            occurrence_gap (OccurrenceGap): Strategy for how occurrences may overlap.
+            element_gap (ElementGap): Strategy for how elements must appear (ordered or any).
+
+        Returns:
+            List[List[int]]: A list of index-lists for each matching occurrence. Empty list if none.
+        """
+        return list(self.iter_find(sublist, occurrence_gap, element_gap))
+
+
+def iter_find_in_list(
+    sublist: Sequence[Any],
+    target: Sequence[Any],
+    ensure_hashable: bool = False,
+    use_custom_str: bool = False,
+    float_precision: int = None,
+    occurrence_gap: OccurrenceGap = OccurrenceGap.ANY,
+    element_gap: ElementGap = ElementGap.ANY,
+    cache_target: bool = False,
+) -> Iterator[List[int]]:
+    """
+    Lazily finds the occurrences of a sublist in a target list with specified gaps.
+    Takes the same arguments as `find_in_list`, but yields each occurrence as soon as
+    it is matched, so callers that only need the first few can stop early.
+
+    Inputs are validated, converted and indexed before this returns, so invalid
+    arguments raise here rather than on the first iteration.
+
+    Returns:
+        Iterator[List[int]]: The index-lists of the matching occurrences, in order.
+
+    Examples:
+        >>> next(iter_find_in_list([2, 3, 2], [1, 2, 3, 2, 4, 2, 3, 2]))
+        [1, 2, 3]
+
+        >>> list(iter_find_in_list([7], [1, 2, 3]))
+        []
+    """
+
+    validate_inputs(sublist, target)
+
+    # Convert the flags to enums (this will raise ValueError if a string is invalid)
+    # e.g. OccurrenceGap("any") -> OccurrenceGap.ANY
+    occurrence_gap = OccurrenceGap(occurrence_gap)
+    element_gap = ElementGap(element_gap)
+
+    # Convert elements to hashable types
+    if ensure_hashable or use_custom_str or float_precision:
+        convert = make_converter(ensure_hashable, use_custom_str, float_precision)
+        sublist = convert(sublist)
+
+    if cache_target:
+        # Check the sublist before indexing target, so that errors do not
+        # depend on whether the target is cached
+        elements = _distinct_elements(sublist)
+        index = _cached_sequence_index(
+            target, ensure_hashable, use_custom_str, float_precision
+        )
+        return index._match_converted(sublist, elements, occurrence_gap, element_gap)
+
+    if ensure_hashable or use_custom_str or float_precision:
+        target = convert(target)
+
+    if (
+        occurrence_gap is OccurrenceGap.NON_NEGATIVE
+        and element_gap is ElementGap.NON_NEGATIVE
+        and _all_scan_types(sublist)
+        and _all_scan_types(target)
+    ):
+        # Ordered, non-overlapping occurrences are the greedy leftmost
+        # embeddings of sublist, found without building an index_map
+        return _find_ordered_non_overlapping(sublist, target)
+
+    index_map = build_index_map(sublist, target)
+    return _match(sublist, index_map, occurrence_gap, element_gap)
+
+
 def find_in_list(
     sublist: Sequence[Any],
     target: Sequence[Any],
@@ -222,6 +911,7 @@ def find_in_list(
     float_precision: int = None,
     occurrence_gap: OccurrenceGap = OccurrenceGap.ANY,
     element_gap: ElementGap = ElementGap.ANY,
+    cache_target: bool = False,
 ) -> List[List[int]]:
     """
     Finds all occurrences of a sublist in a target list with specified gaps.
@@ -235,6 +925,8 @@ def find_in_list(
         float_precision (int, optional): Round floats to this number of decimal places.
         occurrence_gap (OccurrenceGap): Strategy for how occurrences may overlap.
         element_gap (ElementGap): Strategy for how elements must appear (ordered or any).
+        cache_target (bool): Keep the index of `target` for later calls with the same
+            target object. The target must not be modified in place while cached.
 
     Returns:
         List[List[int]]: A list of index-lists for each matching occurrence. Empty list if none.
@@ -245,7 +937,7 @@ def find_in_list(
         [[1, 2, 3]]
 
         >>> find_in_list([2, 3, 2], [3, 2, 6, 2, 4])
-        []
+        [[1, 0, 3]]
 
         >>> find_in_list([1], [3, 1, 1, 5])
         [[1], [2]]
@@ -253,92 +945,15 @@ def find_in_list(
         >>> find_in_list([2, 3, 2], [1, 2, 3, 2, 4, 2, 3, 2])
         [[1, 2, 3], [5, 6, 7]]
     """
-
-    validate_inputs(sublist, target)
-
-    # Convert elements to hashable types
-    if ensure_hashable or use_custom_str or float_precision:
-        sublist = [
-            make_hashable(
-                e,
-                ensure_hashable=ensure_hashable,
-                use_custom_str=use_custom_str,
-                float_precision=float_precision,
-            )
-            for e in sublist
-        ]
-        target = [
-            make_hashable(
-                e,
-                ensure_hashable=ensure_hashable,
-                use_custom_str=use_custom_str,
-                float_precision=float_precision,
-            )
-            for e in target
-        ]
-
-    try:
-        # Attempt to create the index_map
-        index_map = {element: [] for element in set(sublist)}
-    except TypeError as e:
-        raise ValueError("All elements in sublist must be hashable.") from e
-
-    # Populate the index_map with indices of matching elements in the target
-    for index, value in enumerate(target):
-        if value in index_map:
-            index_map[value].append(index)
-
-    # Check if any element in the sublist has no matches in the target
-    if any(not indices for indices in index_map.values()):
-        return []
-
-    # Build the strategies
-
-    def get_occurrence_gap_strategy(flag: OccurrenceGap | str) -> OccurrenceGapStrategy:
-        """
-        Convert the given flag (either an OccurrenceGap enum member or a string)
-        into the appropriate OccurrenceGapStrategy.
-        """
-        if isinstance(flag, str):
-            # Convert string to enum (this will raise ValueError if the string is invalid)
-            flag = OccurrenceGap(flag)
-            # e.g. OccurrenceGap("any") -> OccurrenceGap.ANY
-            #     OccurrenceGap("non-negative") -> OccurrenceGap.NON_NEGATIVE
-
-        # Now 'flag' is guaranteed to be an OccurrenceGap enum
-        return OCCURRENCE_GAP_STRATEGIES[flag]
-
-    def get_element_gap_strategy(flag: ElementGap | str) -> ElementGapStrategy:
-        """
-        Convert the given flag (either an ElementGap enum or a string)
-        into the appropriate ElementGapStrategy.
-        """
-        if isinstance(flag, str):
-            flag = ElementGap(flag)
-        return ELEMENT_GAP_STRATEGIES[flag]
-
-    occ_strategy = get_occurrence_gap_strategy(occurrence_gap)
-    elem_strategy = get_element_gap_strategy(element_gap)
-
-    occurrences = []
-    last_occurrence_max = -1
-
-    while True:
-        current_occurrence = []
-        for element in sublist:
-            # 1) Filter indices for occurrence gaps
-            # This ensures we skip all indices that would violate the "overlap" rule
-            index_map[element] = occ_strategy.filter_indices(
-                index_map[element], last_occurrence_max
-            )
-            # 2) Pick the next index for the element based on the "ordered" or "any" logic
-            found_index = elem_strategy.pick_index(
-                index_map[element], current_occurrence
-            )
-
-            if found_index is None:
-                return occurrences  # no more valid matches
-            current_occurrence.append(found_index)
-
-        occurrences.append(current_occurrence)
-        last_occurrence_max = max(current_occurrence)
+    return list(
+        iter_find_in_list(
+            sublist,
+            target,
+            ensure_hashable=ensure_hashable,
+            use_custom_str=use_custom_str,
+            float_precision=float_precision,
+            occurrence_gap=occurrence_gap,
+            element_gap=element_gap,
+            cache_target=cache_target,
+        )
+    )
@@ -1,10 +1,40 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
-from pyseqr.core import find_in_list, ElementGap, OccurrenceGap
+from pyseqr.core import (
+    find_in_list,
+    iter_find_in_list,
+    clear_target_cache,
+    TARGET_CACHE_SIZE,
+    SequenceIndex,
+    ElementGap,
+    OccurrenceGap,
+)
+
+
+# Target elements outside the C-level scan fast path
+class EqualsAnything:
+    """Hashable, but equal to any object."""
+
+    def __eq__(self, other):
+        return True
+
+    __hash__ = object.__hash__
+
+
+class RaisesOnEq:
+    """Hashable, but raises when compared, like a NumPy array."""
+
+    def __eq__(self, other):
+        raise ValueError("The truth value of the comparison is ambiguous.")
+
+    __hash__ = object.__hash__
 
 
 # Test cases for non-strategy-based function
-basic_test_cases = [
+basic_test_cases = (
     ([2, 3, 2], [1, 2, 3, 2, 4], [[1, 2, 3]]),  # Simple case
     ([1, 2, 3], [1, 2, 3], [[0, 1, 2]]),  # Sublist = target
     ([2, 3, 2], [3, 2, 6, 2, 4], [[1, 0, 3]]),  # Non-contiguous matches
@@ -24,24 +54,50 @@ basic_test_cases = [
         ["abc", "b", "gor", "d", "abc", "gor", "abc", "gor", "abc", "gor"],
         [],
     ),  # No match
-]
+    ([1, 2], (2, 1.0, 2, True), [[1, 0], [3, 2]]),  # Tuple target, equal numerics
+    ([1, 2, 3, 4], [4, 3, 2.0, 1, 5], [[3, 2, 1, 0]]),  # Beyond the scan threshold
+    ([(2,), 1, (2,)], [(2,), 1, 1], []),  # Element repeated more than it occurs
+    (
+        [1, 2],
+        [EqualsAnything(), 1, 2, 1, 2],
+        [[1, 2], [3, 4]],
+    ),  # Non-scalar target element with a permissive __eq__
+    (
+        [1, 2],
+        [1, 2, RaisesOnEq(), 1, 2],
+        [[0, 1], [3, 4]],
+    ),  # Non-scalar target element whose __eq__ raises
+)
 
-exception_test_cases = [
+exception_test_cases = (
     (None, [1, 2, 3], TypeError),  # Non-sequence sublist
     ([1, 2], "abx", TypeError),  # Non-sequence target
     ([1, 2], [1], ValueError),  # Sublist larger than target
     ([], [1, 2, 3], ValueError),  # Empty sublist
     ([1], [], ValueError),  # Empty target
-]
+    ([1, 2], [1, [0], 2], TypeError),  # Unhashable target element
+    ([1, 2], [1, {0}, 2], TypeError),  # Unhashable set target element
+    ([1, 2, 3, 4], [1, {9}, 2, 3, 4], TypeError),  # Same, beyond the scan threshold
+)
+
+# Exception cases that need keyword arguments
+invalid_argument_test_cases = (
+    ([1], [1, 2], {"occurrence_gap": "invalid-gap"}, ValueError),
+    ([1], [1, 2], {"element_gap": "also-invalid"}, ValueError),
+    ([7], [1, 2], {"element_gap": "also-invalid"}, ValueError),  # No match either
+    ([1.5], [1.5, 2], {"float_precision": -1}, ValueError),
+    ([[1]], [[1], {3}], {"cache_target": False}, ValueError),  # Unhashable sublist
+    ([[1]], [[1], {3}], {"cache_target": True}, ValueError),  # Same, cached target
+)
 
 # unhashable_test_cases, e.g. lists, dictionaries etc. that we will attempt to convert to hashable types and proceed with the function
-unhashable_test_cases = [
+unhashable_test_cases = (
     ([1, [2, 3], 4], [1, [2, 3], 4], [[0]]),  # Nested list
     ([1, {2: 3}, 4], [1, {2: 3}, 4], [[0]]),  # Dictionary
-]
+)
 
 # Test cases for float_precision
-float_precision_test_cases = [
+float_precision_test_cases = (
     (
         [1.111, 2.222, 3.333],
         [1.1111, 2.2222, 3.3333],
@@ -50,9 +106,10 @@ float_precision_test_cases = [
     ),  # Default precision
     ([1.111, 2.222, 3.333], [1.1111, 2.2222, 3.3333], [[0, 1, 2]], 3),  # Precision 3
     ([1.111, 2.222, 3.333], [1.1111, 2.2222, 3.3333], [], 4),  # Precision 4
-]
+    ([12.345, 1.0], [1, 12.3449, 12.345], [[2, 0]], 2),  # Values >= 10, int target
+)
 
-gap_test_cases = [
+gap_test_cases = (
     (
         [1, 2],
         [2, 2, 2, 3, 2, 1, 1, 1, 7, 1, 2],
@@ -81,7 +138,35 @@ gap_test_cases = [
         "non-negative",
         [[0, 4], [8, 9]],
     ),  #  no negative occurrence gap (overlap),, no negative element gap (i.e ordered)
-]
+    (
+        [1, 2, 1],
+        [1, 1, 2, 1, 2, 1],
+        "any",
+        "non-negative",
+        [[0, 2, 3], [1, 4, 5]],
+    ),  #  any occurrence gap, ordered, index skipped by first occurrence reused by second
+    (
+        [(1, 2)],
+        [(1, 2), 3, (1, 2)],
+        "non-negative",
+        "non-negative",
+        [[0], [2]],
+    ),  #  single element, every index is an occurrence
+    (
+        [1, 2],
+        [EqualsAnything(), 1, 2, 1, 2],
+        "non-negative",
+        "non-negative",
+        [[1, 2], [3, 4]],
+    ),  #  ordered, non-scalar target element with a permissive __eq__
+    (
+        [1, 2],
+        [1, 2, RaisesOnEq(), 1, 2],
+        "non-negative",
+        "non-negative",
+        [[0, 1], [3, 4]],
+    ),  #  ordered, non-scalar target element whose __eq__ raises
+)
 
 
 # Custom class with a string representation
@@ -103,22 +188,24 @@ class NoStrObject:
 
 
 # Test cases
-custom_object_test_cases = [
+custom_object_test_cases = (
     # Custom objects with string representations
-    (
+    pytest.param(
         [CustomStrObject(1), CustomStrObject(2)],
         [CustomStrObject(1), CustomStrObject(2), CustomStrObject(1)],
         [[0, 1]],
+        id="custom-str",
     ),
     # Custom objects without string representations
-    (
+    pytest.param(
         [NoStrObject(1), NoStrObject(2)],
         [NoStrObject(1), NoStrObject(2), NoStrObject(1)],
         [],  # using default __str__ method, objects are different instances and will not match
+        id="default-str",
     ),
-]
+)
 
-mixed_param_test_cases = [
+mixed_param_test_cases = (
     # (sublist,             target,               ensure_hashable, use_custom_str, float_precision, occurrence_gap,        element_gap,        expected)
     # 1) Using unhashable data (set), ensuring hashable => single match
     (
@@ -153,19 +240,44 @@ mixed_param_test_cases = [
         "any",  # element_gap
         [[0, 1, 2]],
     ),
-]
+    # 4) Dictionary with an unhashable value, ensuring hashable => single match
+    (
+        [1, {2: [3, 4]}],
+        [0, 1, {2: [3, 4]}],
+        True,  # ensure_hashable
+        False,  # use_custom_str
+        None,  # float_precision
+        "any",  # occurrence_gap
+        "any",  # element_gap
+        [[1, 2]],
+    ),
+)
 
 
-@pytest.mark.parametrize("sublist, target, expected", basic_test_cases)
-def test_find_in_list(sublist, target, expected):
-    result = find_in_list(sublist, target)
-    assert result == expected
+def test_find_in_list():
+    # Each table runs in a single test, and a failing case shows up as the
+    # differing index in the result list
+    results = [find_in_list(sublist, target) for sublist, target, _ in basic_test_cases]
+    assert results == [expected for _, _, expected in basic_test_cases]
 
 
-@pytest.mark.parametrize("sublist, target, expected_exception", exception_test_cases)
-def test_find_in_list_exceptions(sublist, target, expected_exception):
-    with pytest.raises(expected_exception):
-        find_in_list(sublist, target)
+def test_find_in_list_exceptions():
+    cases = (
+        tuple(
+            (sublist, target, {}, exception)
+            for sublist, target, exception in exception_test_cases
+        )
+        + invalid_argument_test_cases
+    )
+    raised = []
+    for sublist, target, kwargs, _ in cases:
+        try:
+            find_in_list(sublist, target, **kwargs)
+        except Exception as e:
+            raised.append(type(e))
+        else:
+            raised.append(None)
+    assert raised == [exception for _, _, _, exception in cases]
 
 
 @pytest.mark.parametrize("sublist, target, expected", custom_object_test_cases)
@@ -185,57 +297,38 @@ def test_find_in_list_use_custom_str(sublist, target, expected):
         assert result == expected
 
 
-@pytest.mark.parametrize(
-    "sublist, target, expected, precision", float_precision_test_cases
-)
-def test_find_in_list_float_precision(sublist, target, expected, precision):
-    result = find_in_list(sublist, target, float_precision=precision)
-    assert result == expected
+def test_find_in_list_float_precision():
+    results = [
+        find_in_list(sublist, target, float_precision=precision)
+        for sublist, target, _, precision in float_precision_test_cases
+    ]
+    assert results == [expected for _, _, expected, _ in float_precision_test_cases]
 
 
-@pytest.mark.parametrize(
-    "sublist, target, occurrence_gap, element_gap, expected", gap_test_cases
-)
-def test_find_in_list_gaps(sublist, target, occurrence_gap, element_gap, expected):
-    result = find_in_list(
-        sublist,
-        target,
-        occurrence_gap=occurrence_gap,
-        element_gap=element_gap,
-    )
-    assert result == expected
-
-
-def test_invalid_gap_args():
-    with pytest.raises(ValueError):
-        find_in_list([1], [1, 2], occurrence_gap="invalid-gap")
-    with pytest.raises(ValueError):
-        find_in_list([1], [1, 2], element_gap="also-invalid")
+def test_find_in_list_gaps():
+    results = [
+        find_in_list(
+            sublist,
+            target,
+            occurrence_gap=occurrence_gap,
+            element_gap=element_gap,
+        )
+        for sublist, target, occurrence_gap, element_gap, _ in gap_test_cases
+    ]
+    assert results == [case[-1] for case in gap_test_cases]
 
 
-# A simple custom class with a string representation
-class CustomStrObject:
-    def __init__(self, value):
-        self.value = value
+def test_iter_find_in_list():
+    occurrences = iter_find_in_list([1, 2], [1, 2, 1, 2, 1, 2])
+    assert next(occurrences) == [0, 1]
+    assert list(occurrences) == [[2, 3], [4, 5]]
 
-    def __str__(self):
-        return f"CustomStrObject({self.value})"
+    # Invalid arguments raise before iteration starts
+    with pytest.raises(ValueError):
+        iter_find_in_list([1], [1, 2], element_gap="invalid-gap")
 
 
-@pytest.mark.parametrize(
-    "sublist, target, ensure_hashable, use_custom_str, float_precision, occurrence_gap, element_gap, expected",
-    mixed_param_test_cases,
-)
-def test_find_in_list_mixed_params(
-    sublist,
-    target,
-    ensure_hashable,
-    use_custom_str,
-    float_precision,
-    occurrence_gap,
-    element_gap,
-    expected,
-):
+def test_find_in_list_mixed_params():
     """
     Test find_in_list with various combinations of parameters:
     - ensure_hashable (bool)
@@ -244,13 +337,128 @@ def test_find_in_list_mixed_params(
     - occurrence_gap (OccurrenceGap enum or str)
     - element_gap (ElementGap enum or str)
     """
-    result = find_in_list(
-        sublist=sublist,
-        target=target,
-        ensure_hashable=ensure_hashable,
-        use_custom_str=use_custom_str,
-        float_precision=float_precision,
-        occurrence_gap=occurrence_gap,
-        element_gap=element_gap,
+    results = [
+        find_in_list(
+            sublist=sublist,
+            target=target,
+            ensure_hashable=ensure_hashable,
+            use_custom_str=use_custom_str,
+            float_precision=float_precision,
+            occurrence_gap=occurrence_gap,
+            element_gap=element_gap,
+        )
+        for (
+            sublist,
+            target,
+            ensure_hashable,
+            use_custom_str,
+            float_precision,
+            occurrence_gap,
+            element_gap,
+            _,
+        ) in mixed_param_test_cases
+    ]
+    assert results == [case[-1] for case in mixed_param_test_cases]
+
+
+def test_find_in_list_cache_target():
+    clear_target_cache()
+    try:
+        target = [1, 2, 3, 1, 2, 3]
+        assert find_in_list([1, 2], target, cache_target=True) == [[0, 1], [3, 4]]
+        assert find_in_list([3, 1], target, cache_target=True) == [[2, 0], [5, 3]]
+
+        # A target that changed length is re-indexed
+        target.append(1)
+        assert find_in_list([1], target, cache_target=True) == [[0], [3], [6]]
+
+        # Conversion flags are part of the cache key
+        floats = [1.001, 2.0]
+        assert find_in_list([1.0], floats, cache_target=True) == []
+        assert find_in_list([1.0], floats, float_precision=2, cache_target=True) == [
+            [0]
+        ]
+    finally:
+        clear_target_cache()
+
+
+def test_find_in_list_cache_target_threads():
+    # More targets than cache slots, so threads keep evicting each other's entries
+    targets = [[i, 1, 2, i, 1, 2] for i in range(3, 3 * TARGET_CACHE_SIZE + 3)]
+
+    def search(target):
+        for _ in range(50):
+            assert find_in_list([1, 2], target, cache_target=True) == [[1, 2], [4, 5]]
+
+    clear_target_cache()
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(search, targets))
+    finally:
+        clear_target_cache()
+
+
+def test_sequence_index():
+    index = SequenceIndex(
+        [1.001, [2], 3, [2], 1.0], ensure_hashable=True, float_precision=2
     )
-    assert result == expected
+    assert index.find([1.0, [2]]) == [[0, 1], [4, 3]]
+    assert index.find([[2], 1.0], "non-negative", "non-negative") == [[1, 4]]
+    assert list(index.iter_find([3])) == [[2]]
+    assert index.find([7, 3]) == []
+
+    with pytest.raises(ValueError):
+        index.find([1, 2, 3, 4, 5, 6])  # Sublist larger than target
+
+    # Both entry points agree on targets holding non-scalar elements
+    for target in ([EqualsAnything(), 1, 2, 1, 2], [1, 2, RaisesOnEq(), 1, 2]):
+        for occurrence_gap in ("any", "non-negative"):
+            for element_gap in ("any", "non-negative"):
+                gaps = {"occurrence_gap": occurrence_gap, "element_gap": element_gap}
+                expected = find_in_list([1, 2], target, **gaps)
+                assert SequenceIndex(target).find([1, 2], **gaps) == expected
+    with pytest.raises(TypeError):
+        SequenceIndex("abx")
+    with pytest.raises(ValueError):
+        SequenceIndex([])
+
+
+def naive_find_in_list(sublist, target, occurrence_gap, element_gap):
+    """Reference matcher: a linear scan of target for every element."""
+    used = [False] * len(target)
+    occurrences = []
+    last_occurrence_max = -1
+    while True:
+        occurrence = []
+        for element in sublist:
+            start = last_occurrence_max + 1 if occurrence_gap == "non-negative" else 0
+            if element_gap == "non-negative" and occurrence:
+                start = max(start, occurrence[-1] + 1)
+            for index in range(start, len(target)):
+                if not used[index] and target[index] == element:
+                    break
+            else:
+                return occurrences
+            used[index] = True
+            occurrence.append(index)
+        occurrences.append(occurrence)
+        last_occurrence_max = max(occurrence)
+
+
+@pytest.mark.parametrize("occurrence_gap", ("any", "non-negative"))
+@pytest.mark.parametrize("element_gap", ("any", "non-negative"))
+def test_find_in_list_matches_naive(occurrence_gap, element_gap):
+    rng = random.Random(0)
+    for _ in range(300):
+        alphabet = rng.randint(1, 6)
+        target = [rng.randrange(alphabet) for _ in range(rng.randint(1, 40))]
+        sublist = [rng.randrange(alphabet) for _ in range(rng.randint(1, 5))]
+        if len(sublist) > len(target):
+            continue
+        expected = naive_find_in_list(sublist, target, occurrence_gap, element_gap)
+        result = find_in_list(
+            sublist, target, occurrence_gap=occurrence_gap, element_gap=element_gap
+        )
+        assert result == expected, (sublist, target)
+        indexed = SequenceIndex(target).find(sublist, occurrence_gap, element_gap)
+        assert indexed == expected, (sublist, target)